@@ -1,72 +1,122 @@
+import os
+import multiprocessing
+from constants import NUMBA_CACHE_DIR, KRUMHANSL_MAJOR, KRUMHANSL_MINOR, KEY_NAMES
+
+# numba's cache=True needs a writable cache dir, and it picks it up on import.
+# On read-only installs, keep compiled kernels in the app cache instead.
+if "NUMBA_CACHE_DIR" not in os.environ and not os.access(os.path.dirname(os.path.abspath(__file__)), os.W_OK):
+    os.environ["NUMBA_CACHE_DIR"] = os.path.abspath(NUMBA_CACHE_DIR)
+
 import numpy as np
 import librosa
+from numba import njit
 import pandas as pd
-import os
-from scipy.stats import pearsonr
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import nullcontext
 from cache_utils import get_file_hash, load_from_cache, save_to_cache
-from constants import KRUMHANSL_MAJOR, KRUMHANSL_MINOR, KEY_NAMES
+
+# Pool workers are started from a thread of the Streamlit server, and forking a
+# multithreaded process can leave children stuck on locks held by other threads
+POOL_CONTEXT = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
 
 # Additional key profiles for better accuracy
-TEMPERLEY_MAJOR = np.array([5.0, 2.0, 3.5, 2.0, 4.5, 4.0, 2.0, 4.5, 2.0, 3.5, 1.5, 4.0])
-TEMPERLEY_MINOR = np.array([5.0, 2.0, 3.5, 4.5, 2.0, 4.0, 2.0, 4.5, 3.5, 2.0, 1.5, 4.0])
+TEMPERLEY_MAJOR = np.array([5.0, 2.0, 3.5, 2.0, 4.5, 4.0, 2.0, 4.5, 2.0, 3.5, 1.5, 4.0], dtype=np.float32)
+TEMPERLEY_MINOR = np.array([5.0, 2.0, 3.5, 4.5, 2.0, 4.0, 2.0, 4.5, 3.5, 2.0, 1.5, 4.0], dtype=np.float32)
 
 # Albrecht & Shanahan profiles (2013) - more accurate for pop/rock
-ALBRECHT_MAJOR = np.array([6.44, 2.00, 3.48, 2.19, 4.54, 3.53, 2.39, 5.11, 2.39, 3.66, 2.29, 3.29])
-ALBRECHT_MINOR = np.array([6.26, 2.68, 3.48, 5.83, 2.88, 3.69, 2.46, 5.12, 4.04, 2.69, 3.34, 3.24])
+ALBRECHT_MAJOR = np.array([6.44, 2.00, 3.48, 2.19, 4.54, 3.53, 2.39, 5.11, 2.39, 3.66, 2.29, 3.29], dtype=np.float32)
+ALBRECHT_MINOR = np.array([6.26, 2.68, 3.48, 5.83, 2.88, 3.69, 2.46, 5.12, 4.04, 2.69, 3.34, 3.24], dtype=np.float32)
+
+def shift_matrix(profile):
+    """Stack all 12 rotations of a key profile into a (12, 12) matrix, one key per row.
+    Rows are mean-centered and unit-normalized so Pearson reduces to a dot product."""
+    shifts = np.stack([np.roll(profile, shift) for shift in range(12)])
+    shifts = shifts - shifts.mean(axis=1, keepdims=True)
+    return shifts / np.linalg.norm(shifts, axis=1, keepdims=True)
+
+# Normalized shifted profiles are built once at import instead of per correlation
+KRUMHANSL_MAJOR_SHIFTS = shift_matrix(KRUMHANSL_MAJOR)
+KRUMHANSL_MINOR_SHIFTS = shift_matrix(KRUMHANSL_MINOR)
+TEMPERLEY_MAJOR_SHIFTS = shift_matrix(TEMPERLEY_MAJOR)
+TEMPERLEY_MINOR_SHIFTS = shift_matrix(TEMPERLEY_MINOR)
+ALBRECHT_MAJOR_SHIFTS = shift_matrix(ALBRECHT_MAJOR)
+ALBRECHT_MINOR_SHIFTS = shift_matrix(ALBRECHT_MINOR)
+
+# Stacked as (profile, mode, key, pitch) for the scoring kernel
+PROFILE_STACK = np.ascontiguousarray(np.stack([
+    [KRUMHANSL_MAJOR_SHIFTS, KRUMHANSL_MINOR_SHIFTS],
+    [TEMPERLEY_MAJOR_SHIFTS, TEMPERLEY_MINOR_SHIFTS],
+    [ALBRECHT_MAJOR_SHIFTS, ALBRECHT_MINOR_SHIFTS],
+]))
+PROFILE_WEIGHTS = np.array([0.3, 0.3, 0.4], dtype=np.float32)  # Albrecht weighted highest (best for modern music)
+
+# Pearson is linear in the pre-normalized profiles, so the weighted sum over profiles
+# folds into one (24, 12) matrix: rows 0-11 are major keys, rows 12-23 minor keys.
+# Extra profiles only grow this import-time sum, never the per-track work, so a direct
+# product stays cheaper than an FFT-based circular correlation at this size.
+KEY_PROFILE_MATRIX = np.ascontiguousarray(np.tensordot(PROFILE_WEIGHTS, PROFILE_STACK, axes=1).reshape(24, 12))
+
+KEY_TO_NUM = {k: i for i, k in enumerate(KEY_NAMES)}
+
+# Column layout of the results DataFrame
+RESULT_COLUMNS = [
+    "file", "artist", "track", "key", "mode", "relative_scale",
+    "confidence", "tempo", "energy", "brightness", "scale", "alternative_keys"
+]
+NUMERIC_RESULT_COLUMNS = {"confidence", "tempo", "energy", "brightness"}
+# Low-cardinality labels (at most 25 distinct values) stored as category codes
+CATEGORICAL_RESULT_COLUMNS = ["key", "mode", "relative_scale", "scale"]
+
+def get_harmonic(y):
+    """Harmonic component of the signal via harmonic-percussive separation"""
+    # Only the harmonic part is used, so skip building and inverting the percussive one
+    return librosa.effects.harmonic(y, margin=8)
 
 def get_enhanced_chroma(y, sr):
-    """Extract multiple chroma representations for better accuracy"""
-    # Harmonic-percussive separation
-    y_harmonic, _ = librosa.effects.hpss(y, margin=8)
+    """Extract CQT chroma from the harmonic signal"""
+    y_harmonic = get_harmonic(y).astype(np.float32, copy=False)
     
-    # Multiple chroma types
-    chroma_cqt = librosa.feature.chroma_cqt(y=y_harmonic, sr=sr, hop_length=512, bins_per_octave=36)
-    chroma_stft = librosa.feature.chroma_stft(y=y_harmonic, sr=sr, hop_length=512, n_fft=4096)
-    chroma_cens = librosa.feature.chroma_cens(y=y_harmonic, sr=sr, hop_length=512)
-    
-    # Weight different chroma types
-    chroma_combined = 0.5 * chroma_cqt + 0.3 * chroma_stft + 0.2 * chroma_cens
-    
-    return chroma_combined
+    return librosa.feature.chroma_cqt(y=y_harmonic, sr=sr, hop_length=512, bins_per_octave=36)
 
-def correlate_with_profiles(chroma_vector, profile_major, profile_minor):
-    """Correlate chroma with key profiles using Pearson correlation"""
-    major_corrs = []
-    minor_corrs = []
-    
-    for shift in range(12):
-        major_corr, _ = pearsonr(chroma_vector, np.roll(profile_major, shift))
-        minor_corr, _ = pearsonr(chroma_vector, np.roll(profile_minor, shift))
-        major_corrs.append(major_corr)
-        minor_corrs.append(minor_corr)
-    
-    return np.array(major_corrs), np.array(minor_corrs)
+@njit(cache=True, fastmath=True)
+def score_all(chroma_centered, key_profiles):
+    """Dot product of the chroma vector with every row of the weighted key profile matrix"""
+    scores = np.zeros(key_profiles.shape[0])
+    for k in range(key_profiles.shape[0]):
+        s = 0.0
+        for j in range(12):
+            s += key_profiles[k, j] * chroma_centered[j]
+        scores[k] = s
+    return scores
 
-def detect_key_enhanced(y, sr):
-    """Enhanced key detection using multiple methods"""
-    # Get enhanced chroma
-    chroma = get_enhanced_chroma(y, sr)
-    
-    # Use median instead of mean for robustness
-    chroma_median = np.median(chroma, axis=1)
+def summarize_chroma(chroma):
+    """Collapse a (12, T) chromagram into a normalized 12-bin vector"""
+    # Use median instead of mean for robustness; partition finds it without a full sort
+    n_frames = chroma.shape[1]
+    mid = n_frames // 2
+    if n_frames % 2:
+        chroma_median = np.partition(chroma, mid, axis=1)[:, mid]
+    else:
+        halves = np.partition(chroma, (mid - 1, mid), axis=1)
+        chroma_median = 0.5 * (halves[:, mid - 1] + halves[:, mid])
     
     # Normalize
-    chroma_norm = chroma_median / (np.sum(chroma_median) + 1e-8)
-    
-    # Try multiple key profiles
-    profiles = [
-        (KRUMHANSL_MAJOR, KRUMHANSL_MINOR, 0.3),  # weight 30%
-        (TEMPERLEY_MAJOR, TEMPERLEY_MINOR, 0.3),  # weight 30%
-        (ALBRECHT_MAJOR, ALBRECHT_MINOR, 0.4),    # weight 40% (best for modern music)
-    ]
-    
-    weighted_major_scores = np.zeros(12)
-    weighted_minor_scores = np.zeros(12)
+    return chroma_median / (np.sum(chroma_median) + 1e-8)
+
+def score_keys(chroma_norm):
+    """Weighted Pearson scores of a chroma vector against all major and minor keys"""
+    # Profiles are pre-normalized, so only the chroma needs centering and scaling
+    chroma_centered = chroma_norm.astype(np.float32) - chroma_norm.mean(dtype=np.float32)
+    chroma_centered /= np.linalg.norm(chroma_centered) + 1e-8
     
-    for major_prof, minor_prof, weight in profiles:
-        maj_corrs, min_corrs = correlate_with_profiles(chroma_norm, major_prof, minor_prof)
-        weighted_major_scores += weight * maj_corrs
-        weighted_minor_scores += weight * min_corrs
+    scores = score_all(chroma_centered, KEY_PROFILE_MATRIX)
+    return scores[:12], scores[12:]
+
+def detect_key_enhanced_from_chroma(chroma_norm):
+    """Pick key, mode and confidence from a normalized chroma vector"""
+    weighted_major_scores, weighted_minor_scores = score_keys(chroma_norm)
     
     # Find best matches
     major_idx = np.argmax(weighted_major_scores)
@@ -92,22 +142,21 @@ def detect_key_enhanced(y, sr):
     
     return key_idx, mode, confidence
 
-def segment_based_detection(y, sr, segment_duration=10):
-    """Detect key using segment-based voting"""
-    segment_samples = int(segment_duration * sr)
-    n_segments = max(1, len(y) // segment_samples)
+def segment_based_detection(chroma, sr, segment_duration=10, hop_length=512):
+    """Detect key using segment-based voting over slices of a full-track chromagram"""
+    segment_frames = int(segment_duration * sr / hop_length)
+    n_frames = chroma.shape[1]
+    n_segments = max(1, n_frames // segment_frames)
     
     key_votes = []
     mode_votes = []
     confidences = []
     
     for i in range(n_segments):
-        start = i * segment_samples
-        end = min((i + 1) * segment_samples, len(y))
-        segment = y[start:end]
+        segment = chroma[:, i * segment_frames:(i + 1) * segment_frames]
         
-        if len(segment) > sr:  # At least 1 second
-            key_idx, mode, conf = detect_key_enhanced(segment, sr)
+        if segment.shape[1] > sr / hop_length:  # At least 1 second
+            key_idx, mode, conf = detect_key_enhanced_from_chroma(summarize_chroma(segment))
             key_votes.append(key_idx)
             mode_votes.append(mode)
             confidences.append(conf)
@@ -129,15 +178,47 @@ def segment_based_detection(y, sr, segment_duration=10):
     
     return final_key, final_mode, final_confidence
 
-def relative_major_minor(key_index, mode):
-    """Return relative major/minor key name"""
-    if mode == "minor":
-        rel_index = (key_index + 3) % 12
-        return f"{KEY_NAMES[rel_index]} major"
-    elif mode == "major":
-        rel_index = (key_index - 3) % 12
-        return f"{KEY_NAMES[rel_index]} minor"
-    return "Unknown"
+# Names for the 24 score rows (majors first, then minors), so results index instead of formatting.
+# A major key's relative minor is 3 semitones below it, a minor key's relative major 3 above.
+SCALE_NAMES = KEY_NAMES + [f"{key}m" for key in KEY_NAMES]
+RELATIVE_SCALE_NAMES = (
+    [f"{KEY_NAMES[(k - 3) % 12]} minor" for k in range(12)] +
+    [f"{KEY_NAMES[(k + 3) % 12]} major" for k in range(12)]
+)
+SCALE_LABELS = [f"{SCALE_NAMES[pos]}/{RELATIVE_SCALE_NAMES[pos].split()[0]}" for pos in range(24)]
+
+def load_analysis_window(filepath, sr=22050):
+    """Decode only the part of the track used for analysis, with a fast resampler"""
+    offset, duration = 0.0, None
+    
+    # Skip intro/outro (often have ambiguous harmony)
+    total = librosa.get_duration(path=filepath)
+    if total > 30:  # If longer than 30 seconds
+        offset = 10.0  # Skip first 10 seconds
+        duration = min(total - 10, 120) - offset  # Skip last 10 seconds, max 2 minutes
+    
+    # soxr_lq is several times faster than the soxr_hq default; chroma doesn't need the extra fidelity
+    y, sr = librosa.load(filepath, sr=sr, mono=True, offset=offset, duration=duration, res_type='soxr_lq')
+    return y.astype(np.float32, copy=False), sr
+
+def extract_signal_features(y, sr, n_fft=2048, hop_length=512):
+    """Tempo, RMS and spectral centroid, sharing one STFT between the spectral features"""
+    S = np.abs(librosa.stft(y, n_fft=n_fft, hop_length=hop_length))
+    
+    # Tempo only needs the onset envelope, not the beat-tracking DP pass
+    mel_db = librosa.power_to_db(librosa.feature.melspectrogram(S=S**2, sr=sr))
+    onset_env = librosa.onset.onset_strength(S=mel_db, sr=sr)
+    # tempo() falls back to its prior's BPM on silence; keep beat_track's 0 for "not detectable"
+    tempo = 0.0
+    if onset_env.any():
+        tempo = librosa.feature.tempo(onset_envelope=onset_env, sr=sr, hop_length=hop_length)[0]
+    
+    cent = librosa.feature.spectral_centroid(S=S, sr=sr, n_fft=n_fft, hop_length=hop_length)
+    
+    # RMS stays in the time domain: it needs no FFT, and the windowed STFT would under-report energy
+    rms = librosa.feature.rms(y=y, frame_length=n_fft, hop_length=hop_length)
+    
+    return tempo, rms, cent
 
 def detect_key_librosa(filepath, use_cache=True):
     """Enhanced key detection with multiple algorithms and alternative keys"""
@@ -150,40 +231,20 @@ def detect_key_librosa(filepath, use_cache=True):
                 return cached
         
         # Load audio (analyze middle portion for better results)
-        y, sr = librosa.load(filepath, sr=22050, mono=True)
+        y, sr = load_analysis_window(filepath)
         
-        # Skip intro/outro (often have ambiguous harmony)
-        if len(y) > 30 * sr:  # If longer than 30 seconds
-            start = int(10 * sr)  # Skip first 10 seconds
-            end = min(len(y) - int(10 * sr), int(120 * sr))  # Skip last 10 seconds, max 2 minutes
-            y = y[start:end]
+        # Chroma is computed once and shared by both methods
+        chroma = get_enhanced_chroma(y, sr)
+        chroma_norm = summarize_chroma(chroma)
         
         # Method 1: Enhanced single detection
-        key_idx1, mode1, conf1 = detect_key_enhanced(y, sr)
+        key_idx1, mode1, conf1 = detect_key_enhanced_from_chroma(chroma_norm)
         
         # Method 2: Segment-based voting
-        key_idx2, mode2, conf2 = segment_based_detection(y, sr)
+        key_idx2, mode2, conf2 = segment_based_detection(chroma, sr)
         
         # Store the weighted scores for alternative keys
-        # Get enhanced chroma for final scoring
-        chroma = get_enhanced_chroma(y, sr)
-        chroma_median = np.median(chroma, axis=1)
-        chroma_norm = chroma_median / (np.sum(chroma_median) + 1e-8)
-        
-        # Calculate scores for all keys using all profiles
-        profiles = [
-            (KRUMHANSL_MAJOR, KRUMHANSL_MINOR, 0.3),
-            (TEMPERLEY_MAJOR, TEMPERLEY_MINOR, 0.3),
-            (ALBRECHT_MAJOR, ALBRECHT_MINOR, 0.4),
-        ]
-        
-        weighted_major_scores = np.zeros(12)
-        weighted_minor_scores = np.zeros(12)
-        
-        for major_prof, minor_prof, weight in profiles:
-            maj_corrs, min_corrs = correlate_with_profiles(chroma_norm, major_prof, minor_prof)
-            weighted_major_scores += weight * maj_corrs
-            weighted_minor_scores += weight * min_corrs
+        weighted_major_scores, weighted_minor_scores = score_keys(chroma_norm)
         
         # Combine results from both methods with confidence weighting
         if conf1 > conf2 * 1.2:  # Strong preference for method 1
@@ -201,51 +262,27 @@ def detect_key_librosa(filepath, use_cache=True):
                 else:
                     key_index, mode, confidence = key_idx2, mode2, conf2 * 0.9
         
-        # Get alternative keys
-        all_scores = []
-        for i in range(12):
-            all_scores.append((i, "major", weighted_major_scores[i]))
-            all_scores.append((i, "minor", weighted_minor_scores[i]))
+        # Get alternative keys: rows 0-11 are major, 12-23 minor
+        all_scores = np.concatenate([weighted_major_scores, weighted_minor_scores])
+        main_pos = key_index + (12 if mode == "minor" else 0)
+        main_score = all_scores[main_pos]
         
-        # Sort by score descending
-        all_scores.sort(key=lambda x: x[2], reverse=True)
+        # Top 3 alternatives (excluding the chosen key) without sorting all 24 scores
+        alt_scores = all_scores.copy()
+        alt_scores[main_pos] = -np.inf
+        top = np.argpartition(-alt_scores, 3)[:3]
+        top = top[np.argsort(-alt_scores[top], kind="stable")]
         
-        # Find the main key in the sorted list to normalize scores
-        main_score = 0
-        for idx, (k_idx, m, score) in enumerate(all_scores):
-            if k_idx == key_index and m == mode:
-                main_score = score
-                break
-        
-        # Get top alternatives (excluding the chosen key)
-        alternative_keys = []
-        alternatives_found = 0
-        
-        for key_idx_alt, mode_alt, score_alt in all_scores:
-            # Skip if it's the main key
-            if key_idx_alt == key_index and mode_alt == mode:
-                continue
-            
-            key_name_alt = KEY_NAMES[key_idx_alt]
-            scale_alt = f"{key_name_alt}{'m' if mode_alt=='minor' else ''}"
-            
-            # Calculate relative confidence
-            conf_alt = score_alt / (main_score + 1e-8)
-            
-            alternative_keys.append((scale_alt, round(conf_alt, 3)))
-            alternatives_found += 1
-            
-            if alternatives_found >= 3:  # Get top 3 alternatives
-                break
+        # Confidence of each alternative relative to the chosen key
+        alt_conf = all_scores[top] / (main_score + 1e-8)
+        alternative_keys = [(SCALE_NAMES[pos], round(conf, 3)) for pos, conf in zip(top, alt_conf)]
         
         # Get the detected key name and relative
         detected_key = KEY_NAMES[key_index]
-        rel = relative_major_minor(key_index, mode)
+        rel = RELATIVE_SCALE_NAMES[main_pos]
         
         # Additional features
-        tempo, _ = librosa.beat.beat_track(y=y, sr=sr)
-        rms = librosa.feature.rms(y=y)
-        cent = librosa.feature.spectral_centroid(y=y, sr=sr)
+        tempo, rms, cent = extract_signal_features(y, sr)
         
         # Adjust confidence based on signal characteristics
         energy = float(np.mean(rms))
@@ -260,7 +297,7 @@ def detect_key_librosa(filepath, use_cache=True):
             "tempo": round(float(tempo), 1),
             "energy": round(energy, 3),
             "brightness": round(float(np.mean(cent)), 1),
-            "scale": f"{detected_key}{'m' if mode=='minor' else ''}/{rel.split()[0]}",
+            "scale": SCALE_LABELS[main_pos],
             "alternative_keys": alternative_keys
         }
         
@@ -289,51 +326,102 @@ def extract_metadata_from_filename(filepath):
     filename = os.path.basename(filepath)
     name = os.path.splitext(filename)[0]
     
-    if " - " in name:
-        parts = name.split(" - ", 1)
-        return {"artist": parts[0], "track": parts[1]}
-    else:
-        return {"artist": "Unknown", "track": name}
+    artist, sep, track = name.partition(" - ")
+    if sep:
+        return {"artist": artist, "track": track}
+    return {"artist": "Unknown", "track": name}
 
-def analyze_files(files, progress_callback=None, use_cache=True):
-    """Analyze multiple audio files"""
+def analyze_file(filepath, use_cache=True, analysis=None):
+    """Analyze a single audio file and merge in filename metadata"""
+    metadata = extract_metadata_from_filename(filepath)
+    if analysis is None:
+        analysis = detect_key_librosa(str(filepath), use_cache=use_cache)
+    
+    return {
+        "file": os.path.basename(filepath),
+        "artist": metadata["artist"],
+        "track": metadata["track"],
+        **analysis
+    }
+
+def create_analysis_pool():
+    """Process pool sized for analyze_files, for callers that keep one alive between batches"""
+    return ProcessPoolExecutor(max_workers=os.cpu_count() or 1, mp_context=POOL_CONTEXT)
+
+def analyze_files(files, progress_callback=None, use_cache=True, executor=None):
+    """Analyze multiple audio files in parallel, keeping input order.
+    files may be a generator; each file is submitted as soon as it is yielded.
+    Pass a long-lived executor to reuse warm worker processes across calls."""
+    total = len(files) if hasattr(files, '__len__') else None
     results = []
+    submitted = 0
     
-    for i, filepath in enumerate(files):
-        if progress_callback:
-            progress_callback(i, len(files))
-        
-        metadata = extract_metadata_from_filename(filepath)
-        analysis = detect_key_librosa(str(filepath), use_cache=use_cache)
-        
-        result = {
-            "file": os.path.basename(filepath),
-            "artist": metadata["artist"],
-            "track": metadata["track"],
-            **analysis
-        }
-        results.append(result)
+    def store(i, result):
+        results.append((i, result))
+        # While files are still streaming in, report progress against those seen so far
+        n_seen = total or max(submitted, len(results))
+        if progress_callback and len(results) < n_seen:
+            progress_callback(len(results), n_seen)
+    
+    if progress_callback and total:
+        progress_callback(0, total)
     
-    return pd.DataFrame(results)
+    # Each file is CPU-bound DSP, so fan out across processes
+    max_workers = max(1, min(total or os.cpu_count() or 1, os.cpu_count() or 1))
+    if max_workers == 1:
+        # A single worker gains nothing from a pool but pays for spawning and pickling
+        for i, filepath in enumerate(files):
+            submitted += 1
+            store(i, analyze_file(str(filepath), use_cache))
+    else:
+        # A caller-owned pool is left running for the next batch
+        pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=POOL_CONTEXT) if executor is None else nullcontext(executor)
+        with pool as executor:
+            futures = {}
+            for i, filepath in enumerate(files):
+                submitted += 1
+                # Cache hits are a small JSON read, so skip the round-trip through a worker.
+                # Workers only start on first submit, so a fully cached batch spawns none.
+                cached = load_from_cache(get_file_hash(str(filepath))) if use_cache else None
+                if cached:
+                    store(i, analyze_file(filepath, analysis=cached))
+                    continue
+                
+                futures[executor.submit(analyze_file, str(filepath), use_cache)] = i
+                # Collect whatever finished while waiting on the next file
+                for future in [f for f in futures if f.done()]:
+                    store(futures.pop(future), future.result())
+            
+            for future in as_completed(futures):
+                store(futures[future], future.result())
+    
+    return build_results_frame([result for _, result in sorted(results, key=lambda r: r[0])])
+
+def build_results_frame(rows):
+    """Build the results DataFrame from per-file result dicts"""
+    # Fill typed columns in place so the DataFrame needs no dtype inference
+    columns = {
+        col: np.zeros(len(rows)) if col in NUMERIC_RESULT_COLUMNS else [None] * len(rows)
+        for col in RESULT_COLUMNS
+    }
+    for i, row in enumerate(rows):
+        for col in RESULT_COLUMNS:
+            columns[col][i] = row[col]
+    for col in CATEGORICAL_RESULT_COLUMNS:
+        columns[col] = pd.Categorical(columns[col])
+    
+    return pd.DataFrame(columns, columns=RESULT_COLUMNS)
 
 def calculate_key_transitions(df):
     """Calculate key transitions for playlist analysis"""
-    key_to_num = {k: i for i, k in enumerate(KEY_NAMES)}
-    df['key_num'] = df['key'].map(key_to_num)
-    
-    transitions = []
-    for i in range(len(df) - 1):
-        curr_key = df.iloc[i]['key']
-        next_key = df.iloc[i + 1]['key']
-        curr_num = key_to_num.get(curr_key, 0)
-        next_num = key_to_num.get(next_key, 0)
-        
-        distance = min(abs(next_num - curr_num), 12 - abs(next_num - curr_num))
-        transitions.append({
-            'position': i + 1,
-            'from': f"{curr_key} {df.iloc[i]['mode']}",
-            'to': f"{next_key} {df.iloc[i + 1]['mode']}",
-            'distance': distance
-        })
+    # Unknown keys count as C for distance purposes
+    nums = df['key'].map(KEY_TO_NUM).astype(float).fillna(0).to_numpy(dtype=int)
+    diff = np.abs(nums[1:] - nums[:-1])
+    labels = (df['key'].astype(str) + " " + df['mode'].astype(str)).to_numpy()
     
-    return pd.DataFrame(transitions)
\ No newline at end of file
+    return pd.DataFrame({
+        'position': np.arange(1, len(df)),
+        'from': labels[:-1],
+        'to': labels[1:],
+        'distance': np.minimum(diff, 12 - diff)
+    })
\ No newline at end of file
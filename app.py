@@ -1,21 +1,27 @@
 import streamlit as st
 import os
+import re
+import shutil
 import pandas as pd
 from datetime import datetime
+from functools import partial
+from concurrent.futures.process import BrokenProcessPool
 
 # Import all modules
 from constants import TEMP_DIR, UPLOAD_DIR, CACHE_DIR, SUPPORTED_AUDIO_FORMATS
 from cache_utils import (
     cleanup_temp, ensure_directories, force_cleanup_temp, 
-    get_file_hash, clear_specific_cache, get_cache_info
+    get_buffer_hash, get_dataframe_hash, clear_specific_cache
+)
+from spotify_utils import iter_spotify_downloads
+from analysis import (
+    detect_key_librosa, analyze_files, build_results_frame, calculate_key_transitions, create_analysis_pool
 )
-from spotify_utils import download_spotify
-from analysis import detect_key_librosa, analyze_files, calculate_key_transitions
 from visualization import create_visualizations, create_key_transition_chart
 from export import export_to_csv, export_to_excel, export_to_json
 from ui_components import (
     display_disclaimer, display_sidebar_settings, display_overview_tab,
-    display_detailed_results_tab, display_export_tab
+    display_detailed_results_tab, display_export_tab, cached_cache_info
 )
 
 # Page config with Spotify theme
@@ -27,7 +33,7 @@ st.set_page_config(
 )
 
 # Custom CSS for Spotify-like theme
-st.markdown("""
+SPOTIFY_CSS = """
 <style>
     /* Main background */
     .stApp {
@@ -185,7 +191,17 @@ st.markdown("""
         background-color: #181818 !important;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+@st.cache_resource(show_spinner=False)
+def minify_css(css):
+    """Strip comments and whitespace once per process"""
+    # The style block has to be re-sent on every rerun, so keep it small
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    return re.sub(r"\s*([{};])\s*", r"\1", css).strip()
+
+st.markdown(minify_css(SPOTIFY_CSS), unsafe_allow_html=True)
 
 # Initialize session state
 if 'analysis_results' not in st.session_state:
@@ -193,6 +209,24 @@ if 'analysis_results' not in st.session_state:
 if 'temp_files' not in st.session_state:
     st.session_state.temp_files = []
 
+# Export payloads only depend on the results, so reruns with unchanged results reuse them
+@st.cache_data(show_spinner=False, hash_funcs={pd.DataFrame: get_dataframe_hash})
+def cached_export_csv(df):
+    return export_to_csv(df)
+
+@st.cache_data(show_spinner=False, hash_funcs={pd.DataFrame: get_dataframe_hash})
+def cached_export_excel(df):
+    return export_to_excel(df)
+
+@st.cache_data(show_spinner=False, hash_funcs={pd.DataFrame: get_dataframe_hash})
+def cached_export_json(df):
+    return export_to_json(df)
+
+# Worker processes outlive reruns, so librosa imports and numba compilation happen once
+@st.cache_resource(show_spinner=False)
+def get_analysis_pool():
+    return create_analysis_pool()
+
 def handle_file_upload(use_cache, auto_cleanup):
     """Handle audio file upload"""
     st.header("Upload Audio File")
@@ -206,12 +240,21 @@ def handle_file_upload(use_cache, auto_cleanup):
         )
     
     if uploaded_file is not None:
-        # Save uploaded file
-        ensure_directories(UPLOAD_DIR)
-        filepath = os.path.join(UPLOAD_DIR, uploaded_file.name)
+        # Save uploaded file under its fingerprint so reruns and re-uploads skip the write
+        file_hash = get_buffer_hash(uploaded_file.getbuffer())
+        extension = os.path.splitext(uploaded_file.name)[1].lower()
+        filepath = os.path.join(UPLOAD_DIR, f"{file_hash}{extension}")
         
-        with open(filepath, "wb") as f:
-            f.write(uploaded_file.getbuffer())
+        if not os.path.exists(filepath):
+            # The sidebar cleanup may have removed the directory earlier in this run
+            ensure_directories(UPLOAD_DIR)
+            
+            # Copy in 1 MB chunks rather than writing one full-size buffer
+            uploaded_file.seek(0)
+            partial_path = f"{filepath}.part"
+            with open(partial_path, "wb") as f:
+                shutil.copyfileobj(uploaded_file, f, length=1024 * 1024)
+            os.replace(partial_path, filepath)
         
         st.success(f"✅ Uploaded: {uploaded_file.name}")
         
@@ -223,15 +266,14 @@ def handle_file_upload(use_cache, auto_cleanup):
             with st.spinner("Analyzing audio..."):
                 # Clear old cache if not using cache
                 if not use_cache:
-                    file_hash = get_file_hash(filepath)
                     clear_specific_cache(file_hash)
                 
                 # Analyze single file
                 metadata = {"artist": "User Upload", "track": uploaded_file.name}
                 analysis = detect_key_librosa(filepath, use_cache=use_cache)
                 
-                # Create results dataframe
-                results_df = pd.DataFrame([{
+                # Create results dataframe with the same columns and dtypes as playlist results
+                results_df = build_results_frame([{
                     "file": uploaded_file.name,
                     "artist": metadata["artist"],
                     "track": metadata["track"],
@@ -239,12 +281,14 @@ def handle_file_upload(use_cache, auto_cleanup):
                 }])
                 
                 st.session_state.analysis_results = results_df
+                cached_cache_info.clear()
                 
                 # Cleanup if enabled
                 if auto_cleanup:
                     if not cleanup_temp(UPLOAD_DIR):
                         force_cleanup_temp(UPLOAD_DIR)
                 
+                # Rerun so the sidebar cache stats, drawn above, pick up the new entry
                 st.rerun()
 
 def handle_spotify_input(input_mode, use_cache, auto_cleanup):
@@ -277,22 +321,35 @@ def handle_spotify_input(input_mode, use_cache, auto_cleanup):
             status_text.text("Connecting to Spotify...")
             progress_bar.progress(0.1)
             
-            success, files = download_spotify(spotify_url, TEMP_DIR)
+            files = []
             
-            if success and files:
-                progress_bar.progress(0.5)
-                st.success(f"✅ Downloaded {len(files)} file(s)")
-                
-                # Analyze files
-                status_text.text("🔍 Analyzing audio files...")
-                
-                def update_progress(current, total):
-                    progress = 0.5 + (current / total) * 0.5
-                    progress_bar.progress(progress)
-                    status_text.text(f"Analyzing track {current + 1} of {total}...")
-                
-                results_df = analyze_files(files, progress_callback=update_progress, use_cache=use_cache)
-                
+            def downloaded_files():
+                """Hand each track to analysis as soon as spotDL finishes it"""
+                for path in iter_spotify_downloads(spotify_url, TEMP_DIR):
+                    files.append(path)
+                    status_text.text(f"🔍 Downloaded {len(files)} file(s), analyzing...")
+                    yield path
+            
+            def update_progress(current, total):
+                progress = 0.1 + (current / total) * 0.9
+                progress_bar.progress(progress)
+                status_text.text(f"Analyzing track {current + 1} of {total}...")
+            
+            # Analysis of finished tracks overlaps with spotDL downloading the rest
+            try:
+                results_df = analyze_files(
+                    downloaded_files(), progress_callback=update_progress,
+                    use_cache=use_cache, executor=get_analysis_pool()
+                )
+            except BrokenProcessPool:
+                # A crashed worker poisons the pool, so start a fresh one next time
+                get_analysis_pool.clear()
+                raise
+            
+            # New analyses were saved to the cache
+            cached_cache_info.clear()
+            
+            if files:
                 st.session_state.analysis_results = results_df
                 st.session_state.temp_files = files
                 
@@ -339,10 +396,10 @@ def display_results(confidence_threshold, show_alternatives):
         display_detailed_results_tab(df, confidence_threshold, show_alternatives)
     
     with tab4:
-        # Prepare export data
-        csv_data = export_to_csv(df)
-        excel_data = export_to_excel(df)
-        json_data = export_to_json(df)
+        # Export data is built only when its download button is clicked
+        csv_data = partial(cached_export_csv, df)
+        excel_data = partial(cached_export_excel, df)
+        json_data = partial(cached_export_json, df)
         
         display_export_tab(df, csv_data, excel_data, json_data)
         
@@ -364,37 +421,18 @@ def display_results(confidence_threshold, show_alternatives):
                         st.success("✅ Temporary files force cleaned!")
                         st.rerun()
 
+# Figures only depend on the results, so slider/tab reruns reuse the themed charts
+@st.cache_data(show_spinner=False, hash_funcs={pd.DataFrame: get_dataframe_hash})
+def cached_visualizations(df):
+    return create_visualizations(df)
+
+@st.cache_data(show_spinner=False, hash_funcs={pd.DataFrame: get_dataframe_hash})
+def cached_transition_chart(df):
+    return create_key_transition_chart(calculate_key_transitions(df))
+
 def display_visualizations_tab(df):
     """Display visualization charts with Spotify theme"""
-    # Create visualizations
-    fig_keys, fig_mode, fig_tempo, fig_conf= create_visualizations(df)
-    
-    # Update chart colors to match Spotify theme
-    spotify_colors = {
-        'bg': '#181818',
-        'grid': '#282828',
-        'text': '#FFFFFF',
-        'primary': '#1DB954',
-        'secondary': '#1ED760'
-    }
-    
-    # Apply Spotify theme to all charts
-    for fig in [fig_keys, fig_mode, fig_tempo, fig_conf]:
-        fig.update_layout(
-            plot_bgcolor=spotify_colors['bg'],
-            paper_bgcolor=spotify_colors['bg'],
-            font_color=spotify_colors['text'],
-            title_font_color=spotify_colors['primary'],
-            title_font_size=20,
-            showlegend=True,
-            legend=dict(
-                bgcolor=spotify_colors['grid'],
-                bordercolor=spotify_colors['primary'],
-                borderwidth=1
-            )
-        )
-        fig.update_xaxes(gridcolor=spotify_colors['grid'])
-        fig.update_yaxes(gridcolor=spotify_colors['grid'])
+    fig_keys, fig_mode, fig_tempo, fig_conf = cached_visualizations(df)
     
     # Display charts
     col1, col2 = st.columns(2)
@@ -412,16 +450,7 @@ def display_visualizations_tab(df):
         st.subheader("Advanced Analysis")
         st.write("**Key Transitions in Playlist Order:**")
         
-        transitions_df = calculate_key_transitions(df)
-        fig_trans = create_key_transition_chart(transitions_df)
-        
-        # Apply Spotify theme
-        fig_trans.update_layout(
-            plot_bgcolor=spotify_colors['bg'],
-            paper_bgcolor=spotify_colors['bg'],
-            font_color=spotify_colors['text'],
-            title_font_color=spotify_colors['primary']
-        )
+        fig_trans = cached_transition_chart(df)
         
         st.plotly_chart(fig_trans, use_container_width=True)
 
@@ -459,7 +488,7 @@ def main():
         
         with col2:
             # Show cache size
-            cache_info = get_cache_info()
+            cache_info = cached_cache_info()
             if cache_info['count'] > 0:
                 st.metric("Cache Files", cache_info['count'])
     
@@ -492,14 +521,10 @@ def main():
     """, unsafe_allow_html=True)
 
 if __name__ == "__main__":
-    # Ensure directories exist
-    ensure_directories(TEMP_DIR, UPLOAD_DIR, CACHE_DIR)
-    
-    # Set page title in browser tab
-    st.markdown("""
-        <script>
-            document.title = "Spotify Scaler 🎵"
-        </script>
-    """, unsafe_allow_html=True)
+    # Ensure directories exist once per session; the paths that write to them
+    # recreate them if a cleanup removed them since
+    if 'directories_ready' not in st.session_state:
+        ensure_directories(TEMP_DIR, UPLOAD_DIR, CACHE_DIR)
+        st.session_state.directories_ready = True
     
     main()
\ No newline at end of file
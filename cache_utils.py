@@ -1,42 +1,84 @@
 import os
-import json
 import hashlib
+import itertools
 import shutil
 import time
+import orjson
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from constants import CACHE_DIR
+from constants import CACHE_DIR, NUMBA_CACHE_DIR
 
 def ensure_directories(*directories):
     """Ensure all required directories exist"""
     for directory in directories:
         os.makedirs(directory, exist_ok=True)
 
+# Cap on the total size of cache entries; the oldest are evicted past it
+CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+# Entries are a few hundred bytes, so the directory scan behind the cap only
+# runs every this many writes per process rather than on every save
+CACHE_TRIM_INTERVAL = 256
+_save_counter = itertools.count(1)
+
+# Bytes read from each end of a file to build its cache key
+FINGERPRINT_BYTES = 64 * 1024
+
 def get_file_hash(filepath):
-    """Generate MD5 hash of file for caching"""
-    hash_md5 = hashlib.md5()
+    """Generate BLAKE2b cache key from file size and its first and last 64 KB.
+    mtime is left out so re-downloaded or re-uploaded copies still hit the cache."""
     try:
+        size = os.path.getsize(filepath)
+        hasher = hashlib.blake2b(str(size).encode(), digest_size=16)
         with open(filepath, "rb") as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                hash_md5.update(chunk)
-        return hash_md5.hexdigest()
+            hasher.update(f.read(FINGERPRINT_BYTES))
+            if size > FINGERPRINT_BYTES:
+                f.seek(max(FINGERPRINT_BYTES, size - FINGERPRINT_BYTES))
+                hasher.update(f.read())
+        return hasher.hexdigest()
     except Exception as e:
         print(f"Error hashing file {filepath}: {e}")
         return None
 
+def get_buffer_hash(buffer):
+    """Generate the get_file_hash key for in-memory file contents"""
+    size = len(buffer)
+    hasher = hashlib.blake2b(str(size).encode(), digest_size=16)
+    hasher.update(buffer[:FINGERPRINT_BYTES])
+    if size > FINGERPRINT_BYTES:
+        hasher.update(buffer[max(FINGERPRINT_BYTES, size - FINGERPRINT_BYTES):])
+    return hasher.hexdigest()
+
+def get_dataframe_hash(df):
+    """Stable hash of a results DataFrame, for keying in-session memoization"""
+    # List cells (alternative_keys) aren't hashable by pandas, so hash their string form
+    return int(pd.util.hash_pandas_object(df.astype(str), index=True).sum())
+
+@lru_cache(maxsize=1024)
+def read_cache_entry(cache_file, mtime_ns, size):
+    """Parse a cache file; keyed on its stat so a rewritten entry is read again"""
+    with open(cache_file, 'rb') as f:
+        return orjson.loads(f.read())
+
 def load_from_cache(file_hash):
     """Load analysis results from cache"""
     if not file_hash:
         return None
     
     cache_file = os.path.join(CACHE_DIR, f"{file_hash}.json")
-    if os.path.exists(cache_file):
-        try:
-            with open(cache_file, 'r') as f:
-                return json.load(f)
-        except Exception as e:
-            print(f"Error loading cache: {e}")
-            return None
-    return None
+    try:
+        stat = os.stat(cache_file)
+    except OSError:
+        return None
+    
+    try:
+        # Hand out a copy so callers can't modify the memoized entry
+        return dict(read_cache_entry(cache_file, stat.st_mtime_ns, stat.st_size))
+    except Exception as e:
+        print(f"Error loading cache: {e}")
+        return None
 
 def save_to_cache(file_hash, results):
     """Save analysis results to cache"""
@@ -46,18 +88,82 @@ def save_to_cache(file_hash, results):
     ensure_directories(CACHE_DIR)
     cache_file = os.path.join(CACHE_DIR, f"{file_hash}.json")
     
+    # Write to a temp file and swap it in, so an interrupted write never leaves
+    # a truncated entry behind (pid-suffixed since pool workers save concurrently)
+    tmp_file = f"{cache_file}.{os.getpid()}.tmp"
     try:
-        with open(cache_file, 'w') as f:
-            json.dump(results, f)
+        with open(tmp_file, 'wb') as f:
+            # Alternative key scores are numpy floats, which orjson needs the option for
+            f.write(orjson.dumps(results, option=orjson.OPT_SERIALIZE_NUMPY))
+        os.replace(tmp_file, cache_file)
     except Exception as e:
         print(f"Error saving to cache: {e}")
+        try:
+            os.remove(tmp_file)
+        except OSError:
+            pass
+        return
+    
+    if next(_save_counter) % CACHE_TRIM_INTERVAL == 0:
+        try:
+            trim_cache()
+        except Exception as e:
+            # A failed trim mustn't turn a finished analysis into an error
+            print(f"Error trimming cache: {e}")
+
+def trim_cache(max_bytes=CACHE_MAX_BYTES):
+    """Evict the least recently written cache entries until the cache fits in max_bytes"""
+    entries = []
+    total_size = 0
+    with os.scandir(CACHE_DIR) as it:
+        for entry in it:
+            if not entry.name.endswith(".json"):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total_size += stat.st_size
+    
+    removed_count = 0
+    if total_size <= max_bytes:
+        return removed_count
+    
+    for _, size, path in sorted(entries):
+        if total_size <= max_bytes:
+            break
+        try:
+            os.unlink(path)
+            removed_count += 1
+        except FileNotFoundError:
+            pass  # Another worker evicted it first
+        except Exception as e:
+            print(f"Error evicting cache file {path}: {e}")
+            continue
+        total_size -= size
+    
+    return removed_count
 
 def clear_cache():
     """Clear all cached results"""
     if os.path.exists(CACHE_DIR):
         try:
-            shutil.rmtree(CACHE_DIR)
-            os.makedirs(CACHE_DIR)
+            # Unlink the many small entry files from a thread pool; only
+            # subdirectories go through rmtree. The directory itself is kept.
+            with os.scandir(CACHE_DIR) as it:
+                entries = list(it)
+            files = [Path(e.path) for e in entries if not e.is_dir(follow_symlinks=False)]
+            with ThreadPoolExecutor(max_workers=32) as executor:
+                # A worker's temp file may be swapped in, or an entry trimmed, meanwhile
+                list(executor.map(lambda f: f.unlink(missing_ok=True), files))
+            # Compiled numba kernels aren't analysis results, so they survive a clear
+            numba_dir = os.path.abspath(NUMBA_CACHE_DIR)
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False) and os.path.abspath(entry.path) != numba_dir:
+                    shutil.rmtree(entry.path)
+            # Lookups already miss once the files are gone; this frees the memoized entries
+            read_cache_entry.cache_clear()
             return True
         except Exception as e:
             print(f"Error clearing cache: {e}")
@@ -84,6 +190,26 @@ def cleanup_temp(dir_path):
     if not os.path.exists(dir_path):
         return True
     
+    # Where the OS supports it, unlink entries relative to an open directory fd so
+    # each removal skips path resolution; the locking retries below are for Windows
+    if os.unlink in os.supports_dir_fd:
+        try:
+            dir_fd = os.open(dir_path, os.O_RDONLY)
+            try:
+                with os.scandir(dir_fd) as it:
+                    for entry in it:
+                        if entry.is_dir(follow_symlinks=False):
+                            shutil.rmtree(entry.name, dir_fd=dir_fd)
+                        else:
+                            os.unlink(entry.name, dir_fd=dir_fd)
+            finally:
+                os.close(dir_fd)
+            os.rmdir(dir_path)
+            return True
+        except Exception as e:
+            print(f"Error cleaning up {dir_path}: {e}")
+            return False
+    
     # Try multiple times with delays (Windows file locking issues)
     max_attempts = 3
     for attempt in range(max_attempts):
@@ -130,29 +256,24 @@ def get_cache_info():
     if not os.path.exists(CACHE_DIR):
         return {"count": 0, "size": 0, "files": []}
     
-    cache_files = list(Path(CACHE_DIR).glob("*.json"))
-    total_size = sum(f.stat().st_size for f in cache_files)
+    # scandir entries cache their stat, so each file is stat'ed once
+    with os.scandir(CACHE_DIR) as it:
+        cache_files = [e for e in it if e.name.endswith(".json") and e.is_file(follow_symlinks=False)]
     
+    # Entries hold only the key analysis (track and artist come from the audio
+    # filename), so the listing is built from directory metadata without opening them
+    total_size = 0
     files_info = []
     for f in cache_files:
-        try:
-            with open(f, 'r') as file:
-                data = json.load(file)
-                files_info.append({
-                    "hash": f.stem,
-                    "size": f.stat().st_size,
-                    "modified": f.stat().st_mtime,
-                    "track": data.get("track", "Unknown"),
-                    "artist": data.get("artist", "Unknown")
-                })
-        except:
-            files_info.append({
-                "hash": f.stem,
-                "size": f.stat().st_size,
-                "modified": f.stat().st_mtime,
-                "track": "Unknown",
-                "artist": "Unknown"
-            })
+        stat = f.stat()
+        total_size += stat.st_size
+        files_info.append({
+            "hash": f.name[:-len(".json")],
+            "size": stat.st_size,
+            "modified": stat.st_mtime,
+            "track": "Unknown",
+            "artist": "Unknown"
+        })
     
     return {
         "count": len(cache_files),
@@ -169,13 +290,16 @@ def cleanup_old_cache(days=7):
     cutoff_time = current_time - (days * 24 * 60 * 60)
     removed_count = 0
     
-    for cache_file in Path(CACHE_DIR).glob("*.json"):
-        try:
-            if cache_file.stat().st_mtime < cutoff_time:
-                cache_file.unlink()
-                removed_count += 1
-        except Exception as e:
-            print(f"Error removing old cache file {cache_file}: {e}")
+    with os.scandir(CACHE_DIR) as it:
+        for cache_file in it:
+            if not cache_file.name.endswith(".json"):
+                continue
+            try:
+                if cache_file.stat().st_mtime < cutoff_time:
+                    os.unlink(cache_file.path)
+                    removed_count += 1
+            except Exception as e:
+                print(f"Error removing old cache file {cache_file.path}: {e}")
     
     return removed_count
 
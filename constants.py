@@ -1,13 +1,16 @@
+import os
 import numpy as np
 
 # Directory constants
 TEMP_DIR = "./temp"
 UPLOAD_DIR = "./temp_upload"
 CACHE_DIR = "./cache"
+# Compiled numba kernels on read-only installs; kept when the analysis cache is cleared
+NUMBA_CACHE_DIR = os.path.join(CACHE_DIR, "numba")
 
 # Krumhansl key profiles
-KRUMHANSL_MAJOR = np.array([6.35, 2.23, 3.48, 2.33, 4.38, 4.09, 2.52, 5.19, 2.39, 3.66, 2.29, 2.88])
-KRUMHANSL_MINOR = np.array([6.33, 2.68, 3.52, 5.38, 2.60, 3.53, 2.54, 4.75, 3.98, 2.69, 3.34, 3.17])
+KRUMHANSL_MAJOR = np.array([6.35, 2.23, 3.48, 2.33, 4.38, 4.09, 2.52, 5.19, 2.39, 3.66, 2.29, 2.88], dtype=np.float32)
+KRUMHANSL_MINOR = np.array([6.33, 2.68, 3.52, 5.38, 2.60, 3.53, 2.54, 4.75, 3.98, 2.69, 3.34, 3.17], dtype=np.float32)
 
 # Musical constants
 KEY_NAMES = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
@@ -1,7 +1,7 @@
 import pandas as pd
 from datetime import datetime
 from io import BytesIO
-import json
+import orjson
 
 def export_to_csv(df):
     """Export dataframe to CSV"""
@@ -13,25 +13,40 @@ def export_to_excel(df):
     output = BytesIO()
     export_df = prepare_export_data(df)
     
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+    # Assemble the workbook parts in memory instead of staging them as temp files.
+    # constant_memory is not an option: sheets are written column by column and the
+    # headers are rewritten afterwards, both of which that row-streaming mode drops.
+    with pd.ExcelWriter(output, engine='xlsxwriter', engine_kwargs={'options': {'in_memory': True}}) as writer:
         # Main results sheet
-        export_df.to_excel(writer, sheet_name='Analysis Results', index=False)
+        write_sheet(writer, export_df, 'Analysis Results')
         
         # Summary sheet
         summary_df = create_summary_dataframe(df)
-        summary_df.to_excel(writer, sheet_name='Summary', index=False)
+        write_sheet(writer, summary_df, 'Summary')
         
         # Key distribution sheet
         key_dist = df['scale'].value_counts().reset_index()
         key_dist.columns = ['Key', 'Count']
         key_dist['Percentage'] = (key_dist['Count'] / len(df) * 100).round(1)
-        key_dist.to_excel(writer, sheet_name='Key Distribution', index=False)
+        write_sheet(writer, key_dist, 'Key Distribution')
         
         # Format the Excel file
         format_excel_sheets(writer, export_df, summary_df, key_dist)
     
     return output.getvalue()
 
+def write_sheet(writer, df, sheet_name):
+    """Write a DataFrame to a new sheet column by column, bypassing pandas' per-cell formatter"""
+    worksheet = writer.book.add_worksheet(sheet_name)
+    worksheet.write_row(0, 0, [str(col) for col in df.columns])
+    
+    for col_num, col in enumerate(df.columns):
+        values = df[col].astype(object).where(df[col].notna(), None).tolist()
+        # Like pandas, write list cells (alternative keys) as their string form and NaN as blank
+        if df[col].dtype == object:
+            values = [str(v) if isinstance(v, (list, tuple)) else v for v in values]
+        worksheet.write_column(1, col_num, values)
+
 def export_to_json(df):
     """Export dataframe to JSON"""
     export_df = prepare_export_data(df)
@@ -51,17 +66,19 @@ def export_to_json(df):
         "tracks": json_data
     }
     
-    return json.dumps(export_data, indent=2)
+    # orjson writes the bytes for the download directly, without an intermediate str
+    return orjson.dumps(export_data, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY)
 
 def prepare_export_data(df):
     """Prepare dataframe for export"""
-    export_df = df.copy()
-    export_df['analysis_date'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    return export_df
+    # assign returns a new frame sharing df's columns under copy-on-write, so the
+    # caller's results are untouched without deep-copying every column per export
+    return df.assign(analysis_date=datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
 
 def create_summary_dataframe(df):
     """Create summary statistics dataframe"""
-    tempo_data = df[df['tempo'] > 0]['tempo']
+    # Format the same stats the JSON export uses rather than recomputing them
+    stats = create_summary_dict(df)
     
     summary_data = {
         'Metric': [
@@ -76,15 +93,15 @@ def create_summary_dataframe(df):
             'Avg Brightness'
         ],
         'Value': [
-            len(df),
-            f"{tempo_data.mean():.1f} BPM" if not tempo_data.empty else "N/A",
-            f"{df['confidence'].mean():.1%}",
-            df['scale'].mode()[0] if not df.empty else "N/A",
-            len(df[df['mode'] == 'major']),
-            len(df[df['mode'] == 'minor']),
-            len(df[df['key'] == 'Unknown']),
-            f"{df['energy'].mean():.3f}",
-            f"{df['brightness'].mean():.1f}"
+            stats['total_tracks'],
+            f"{stats['average_tempo']:.1f} BPM" if stats['average_tempo'] is not None else "N/A",
+            f"{stats['average_confidence']:.1%}",
+            stats['most_common_key'] if stats['most_common_key'] is not None else "N/A",
+            stats['major_tracks'],
+            stats['minor_tracks'],
+            stats['unknown_keys'],
+            f"{stats['average_energy']:.3f}",
+            f"{stats['average_brightness']:.1f}"
         ]
     }
     
@@ -92,18 +109,21 @@ def create_summary_dataframe(df):
 
 def create_summary_dict(df):
     """Create summary statistics dictionary"""
-    tempo_data = df[df['tempo'] > 0]['tempo']
+    tempo_data = df['tempo'][df['tempo'] > 0]
+    # One pass each for the mode counts and the column means, instead of a filter per stat
+    mode_counts = df['mode'].value_counts()
+    means = df[['confidence', 'energy', 'brightness']].mean()
     
     return {
         'total_tracks': len(df),
         'average_tempo': float(tempo_data.mean()) if not tempo_data.empty else None,
-        'average_confidence': float(df['confidence'].mean()),
+        'average_confidence': float(means['confidence']),
         'most_common_key': df['scale'].mode()[0] if not df.empty else None,
-        'major_tracks': int(len(df[df['mode'] == 'major'])),
-        'minor_tracks': int(len(df[df['mode'] == 'minor'])),
-        'unknown_keys': int(len(df[df['key'] == 'Unknown'])),
-        'average_energy': float(df['energy'].mean()),
-        'average_brightness': float(df['brightness'].mean())
+        'major_tracks': int(mode_counts.get('major', 0)),
+        'minor_tracks': int(mode_counts.get('minor', 0)),
+        'unknown_keys': int((df['key'] == 'Unknown').sum()),
+        'average_energy': float(means['energy']),
+        'average_brightness': float(means['brightness'])
     }
 
 def format_excel_sheets(writer, export_df, summary_df, key_dist):
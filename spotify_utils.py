@@ -1,20 +1,75 @@
 import os
+import re
 import subprocess
 from pathlib import Path
 
-def download_spotify(url, output_dir="./temp"):
-    """Minimal spotDL download."""
-    os.makedirs(output_dir, exist_ok=True)
+# Per-track search/download round-trips are network-bound, so overlap more than spotDL's default 4
+DOWNLOAD_THREADS = 8
+
+# spotDL logs `Downloaded "<artist> - <title>": <url>` once a file is fully written
+DOWNLOADED_LINE = re.compile(r'^Downloaded "(.*)":')
+
+def list_mp3s(output_dir):
+    """Visible .mp3 files in output_dir (glob("*.mp3") semantics), sorted by name"""
+    with os.scandir(output_dir) as it:
+        return sorted(
+            output_dir / entry.name for entry in it
+            if entry.name.endswith(".mp3") and not entry.name.startswith(".") and entry.is_file()
+        )
+
+def sanitize_filename_part(value):
+    """Apply spotDL's sanitize_string, which it runs on each field of the filename template"""
+    value = "".join(char for char in value if char not in "/?\\*|<>")
+    value = re.sub(r"\s{2,}", " ", value)
+    return value.replace('"', "'").replace(":", "-")
+
+def match_download(display_name, paths):
+    """The file among paths that spotDL wrote for a `Downloaded` display name, if any"""
+    # The display name carries the first artist only, while the default
+    # "{artists} - {title}" filename lists further artists after it
+    artist, _, title = display_name.partition(" - ")
+    artist, title = sanitize_filename_part(artist), sanitize_filename_part(title)
+    for path in paths:
+        stem = path.stem
+        if stem == f"{artist} - {title}" or (stem.startswith(f"{artist}, ") and stem.endswith(f" - {title}")):
+            return path
+    return None
+
+def iter_spotify_downloads(url, output_dir="./temp", threads=DOWNLOAD_THREADS):
+    """Run spotDL and yield each mp3 as soon as it has finished downloading."""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    seen = set()
+    pending = ""
     
-    # Change to output directory before downloading
-    original_dir = os.getcwd()
-    os.chdir(output_dir)
+    # Run inside output_dir via cwd rather than os.chdir, which is process-wide
+    with subprocess.Popen(
+        ["spotdl", "download", url, "--threads", str(threads)], cwd=output_dir, text=True,
+        stdout=subprocess.PIPE, stderr=subprocess.STDOUT
+    ) as proc:
+        for line in proc.stdout:
+            line = line.strip()
+            if line.startswith("Downloaded"):
+                pending = line
+            elif pending:
+                # Rich wraps long lines on a pipe, so the name may continue on the next line
+                pending = f"{pending} {line}"
+            else:
+                continue
+            match = DOWNLOADED_LINE.match(pending)
+            if not match:
+                continue
+            pending = ""
+            
+            # Only the file named after the reported track is known to be complete;
+            # others may still be converting or having their metadata embedded
+            path = match_download(match.group(1), [p for p in list_mp3s(output_dir) if p not in seen])
+            if path:
+                seen.add(path)
+                yield path
     
-    try:
-        subprocess.run(["spotdl", "download", url], capture_output=True)
-        files = list(Path(".").glob("*.mp3"))
-        return True, [Path(output_dir) / f for f in files]
-    except:
-        return False, []
-    finally:
-        os.chdir(original_dir)
+    # spotDL has exited, so whatever didn't match a progress line (skipped
+    # existing files, truncated names) is complete now
+    for path in list_mp3s(output_dir):
+        if path not in seen:
+            yield path
@@ -1,8 +1,50 @@
+import heapq
 import streamlit as st
+import numpy as np
 import pandas as pd
 from datetime import datetime
+from operator import itemgetter
+from types import SimpleNamespace
 from cache_utils import clear_cache, cleanup_old_cache, get_cache_info, clear_specific_cache
 
+# Columns and formatting for the detailed results table
+DETAIL_COLUMNS = [
+    'confidence_indicator',
+    'track', 
+    'artist', 
+    'scale',
+    'relative_scale',
+    'tempo', 
+    'confidence', 
+    'energy', 
+    'brightness'
+]
+
+# Fields shown in the selected track's detail panel, in unpacking order
+TRACK_DETAIL_COLUMNS = [
+    'track',
+    'artist',
+    'key',
+    'mode',
+    'scale',
+    'relative_scale',
+    'tempo',
+    'confidence',
+    'energy',
+    'brightness',
+    'alternative_keys'
+]
+
+# Indicator and text color per confidence band (high >= 0.7, medium >= 0.5, low)
+CONFIDENCE_ICONS = np.array(['🟢', '🟡', '🔴'])
+CONFIDENCE_COLORS = np.array(['green', 'orange', 'red'])
+
+DETAIL_COLUMN_CONFIG = {
+    'confidence_indicator': st.column_config.TextColumn('', width='small'),
+    'confidence': st.column_config.NumberColumn('Confidence', format='%.1%'),
+    'tempo': st.column_config.NumberColumn('Tempo', format='%.1f BPM'),
+}
+
 def display_disclaimer():
     """Display legal disclaimer"""
     with st.expander("⚠️ Important Legal Notice"):
@@ -96,34 +138,65 @@ def display_sidebar_settings():
         
         return input_mode, use_cache, auto_cleanup, confidence_threshold, show_alternatives
 
+# Only these columns feed the summary, so only they are hashed for its cache key
+SUMMARY_COLUMNS = ['confidence', 'tempo', 'scale', 'mode']
+
+@st.cache_data(show_spinner=False)
+def compute_summary(df):
+    """Statistics shared by the overview and export tabs, computed once per results"""
+    confidence = df['confidence'].to_numpy()
+    high_conf = int((confidence >= 0.7).sum())
+    low_conf = int((confidence < 0.5).sum())
+    # Mask the column alone; tempo 0 means it could not be detected
+    tempo = df['tempo']
+    
+    # Track count and mean confidence per key and per mode, one grouped pass each.
+    # A stable sort keeps ties in category (alphabetical) order, matching mode().
+    key_stats = (df.groupby('scale', observed=True)['confidence'].agg(['size', 'mean'])
+                 .sort_values('size', ascending=False, kind='stable'))
+    mode_stats = (df.groupby('mode', observed=True)['confidence'].agg(['size', 'mean'])
+                  .sort_values('size', ascending=False, kind='stable'))
+    
+    return SimpleNamespace(
+        total=len(df),
+        avg_tempo=tempo[tempo > 0].mean(),
+        avg_confidence=df['confidence'].mean(),
+        high_conf=high_conf,
+        med_conf=len(df) - high_conf - low_conf,
+        low_conf=low_conf,
+        key_stats=key_stats,
+        mode_stats=mode_stats
+    )
+
 def display_overview_tab(df):
     """Display overview statistics with confidence metrics"""
+    summary = compute_summary(df[SUMMARY_COLUMNS])
+    key_stats = summary.key_stats
+    
     # Summary statistics
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        st.metric("Total Tracks", len(df))
+        st.metric("Total Tracks", summary.total)
     
     with col2:
-        avg_tempo = df[df['tempo'] > 0]['tempo'].mean()
+        avg_tempo = summary.avg_tempo
         st.metric("Avg Tempo", f"{avg_tempo:.1f} BPM" if not pd.isna(avg_tempo) else "N/A")
     
     with col3:
-        avg_confidence = df['confidence'].mean()
+        avg_confidence = summary.avg_confidence
         color = "🟢" if avg_confidence > 0.7 else "🟡" if avg_confidence > 0.5 else "🔴"
         st.metric(f"{color} Avg Confidence", f"{avg_confidence:.2%}")
     
     with col4:
-        most_common = df['scale'].mode()[0] if not df.empty else "N/A"
+        most_common = key_stats.index[0] if not key_stats.empty else "N/A"
         st.metric("Most Common Key", most_common)
     
     # Confidence distribution
     st.subheader("Detection Confidence Overview")
     col1, col2, col3 = st.columns(3)
     
-    high_conf = len(df[df['confidence'] >= 0.7])
-    med_conf = len(df[(df['confidence'] >= 0.5) & (df['confidence'] < 0.7)])
-    low_conf = len(df[df['confidence'] < 0.5])
+    high_conf, med_conf, low_conf = summary.high_conf, summary.med_conf, summary.low_conf
     
     with col1:
         st.metric("🟢 High Confidence", f"{high_conf} ({high_conf/len(df)*100:.1f}%)")
@@ -134,126 +207,144 @@ def display_overview_tab(df):
     
     # Key distribution summary
     st.subheader("Key Distribution")
-    key_summary = df['scale'].value_counts().reset_index()
-    key_summary.columns = ['Key', 'Count']
-    key_summary['Percentage'] = (key_summary['Count'] / len(df) * 100).round(1)
-    
-    # Add average confidence per key
-    key_confidence = df.groupby('scale')['confidence'].mean().round(3)
-    key_summary['Avg Confidence'] = key_summary['Key'].map(key_confidence)
+    key_summary = pd.DataFrame({
+        'Key': key_stats.index.astype(str),
+        'Count': key_stats['size'].to_numpy(),
+        'Percentage': (key_stats['size'] / len(df) * 100).round(1).to_numpy(),
+        'Avg Confidence': key_stats['mean'].round(3).to_numpy()
+    })
     
     col1, col2 = st.columns(2)
     with col1:
-        st.dataframe(key_summary, use_container_width=True, hide_index=True)
+        # At most 24 rows, so a static table instead of the interactive grid
+        st.table(key_summary, hide_index=True)
     
     with col2:
-        # Mode distribution
-        mode_dist = df['mode'].value_counts()
-        st.write("**Mode Distribution:**")
-        for mode, count in mode_dist.items():
-            percentage = count / len(df) * 100
-            avg_conf = df[df['mode'] == mode]['confidence'].mean()
-            st.write(f"- {mode.capitalize()}: {count} tracks ({percentage:.1f}%) - Avg confidence: {avg_conf:.2%}")
+        # Mode distribution, sent as one markdown element
+        lines = [
+            f"- {mode.capitalize()}: {count} tracks ({count / len(df) * 100:.1f}%) - Avg confidence: {avg_conf:.2%}"
+            for mode, count, avg_conf in summary.mode_stats.itertuples()
+        ]
+        st.markdown("**Mode Distribution:**\n" + "\n".join(lines))
+
+@st.cache_data(show_spinner=False)
+def filter_options(df):
+    """Distinct values per column for the detail filters, in order of first appearance"""
+    return {col: df[col].unique().tolist() for col in df.columns}
 
+def category_mask(series, selected):
+    """Row mask for a categorical column, testing membership once per category rather than per row"""
+    # Missing values have code -1, which picks the trailing False
+    allowed = np.append(series.cat.categories.isin(set(selected)), False)
+    return allowed[series.cat.codes.to_numpy()]
+
+# A fragment, so the key/mode/confidence filters rerun only this tab
+@st.fragment
 def display_detailed_results_tab(df, confidence_threshold=0.5, show_alternatives=True):
     """Display detailed results with confidence warnings and alternatives"""
     st.subheader("Track Analysis Details")
     
     # Add filters
+    options = filter_options(df[['key', 'mode']])
     col1, col2, col3 = st.columns(3)
     with col1:
-        key_filter = st.multiselect("Filter by key:", options=df['key'].unique(), default=df['key'].unique())
+        key_filter = st.multiselect("Filter by key:", options=options['key'], default=options['key'])
     with col2:
-        mode_filter = st.multiselect("Filter by mode:", options=df['mode'].unique(), default=df['mode'].unique())
+        mode_filter = st.multiselect("Filter by mode:", options=options['mode'], default=options['mode'])
     with col3:
         confidence_filter = st.slider("Min confidence:", 0.0, 1.0, 0.0, 0.05)
     
-    # Apply filters
-    filtered_df = df[
-        (df['key'].isin(key_filter)) & 
-        (df['mode'].isin(mode_filter)) & 
-        (df['confidence'] >= confidence_filter)
-    ]
+    # Apply filters, combining the masks in place into one boolean array
+    mask = df['confidence'].to_numpy() >= confidence_filter
+    mask &= category_mask(df['key'], key_filter)
+    mask &= category_mask(df['mode'], mode_filter)
+    filtered_df = df[mask]
+    
+    confidence = filtered_df['confidence'].to_numpy()
     
     # Display warning for low confidence tracks
-    low_conf_tracks = filtered_df[filtered_df['confidence'] < confidence_threshold]
-    if len(low_conf_tracks) > 0:
-        st.warning(f"⚠️ {len(low_conf_tracks)} tracks have low confidence (< {confidence_threshold:.0%}) in key detection")
+    low_conf_count = int((confidence < confidence_threshold).sum())
+    if low_conf_count > 0:
+        st.warning(f"⚠️ {low_conf_count} tracks have low confidence (< {confidence_threshold:.0%}) in key detection")
     
-    # Display table with confidence indicators
-    display_df = filtered_df.copy()
-    display_df['confidence_indicator'] = display_df['confidence'].apply(
-        lambda x: '🟢' if x >= 0.7 else '🟡' if x >= 0.5 else '🔴'
-    )
+    # Confidence band of every row, computed once for the table and the track picker
+    bands = np.select([confidence >= 0.7, confidence >= 0.5], [0, 1], default=2)
+    conf_icons = CONFIDENCE_ICONS[bands]
+    conf_colors = CONFIDENCE_COLORS[bands]
     
-    display_columns = [
-        'confidence_indicator',
-        'track', 
-        'artist', 
-        'scale',
-        'relative_scale',
-        'tempo', 
-        'confidence', 
-        'energy', 
-        'brightness'
-    ]
+    # Display table with confidence indicators. Select the shown columns before
+    # adding the indicator, so no other columns (like alternative_keys) get copied.
+    display_df = filtered_df[DETAIL_COLUMNS[1:]].assign(confidence_indicator=conf_icons)
     
     st.dataframe(
-        display_df[display_columns].round(3),
+        display_df[DETAIL_COLUMNS].round(3),
         use_container_width=True,
         hide_index=True,
-        column_config={
-            'confidence_indicator': st.column_config.TextColumn('', width='small'),
-            'confidence': st.column_config.NumberColumn('Confidence', format='%.1%'),
-            'tempo': st.column_config.NumberColumn('Tempo', format='%.1f BPM'),
-        }
+        column_config=DETAIL_COLUMN_CONFIG
     )
     
-    # Track details expander with enhanced information
+    # One detail panel for the picked track rather than an expander per track,
+    # so a long playlist adds a single selectbox instead of thousands of elements
     st.subheader("Individual Track Details")
-    for idx, row in filtered_df.iterrows():
-        # Add confidence indicator to expander title
-        conf_icon = '🟢' if row['confidence'] >= 0.7 else '🟡' if row['confidence'] >= 0.5 else '🔴'
+    if filtered_df.empty:
+        return
+    
+    labels = dict(zip(
+        filtered_df.index,
+        (f"{icon} {track} - {artist}" for icon, track, artist
+         in zip(conf_icons, filtered_df['track'].to_numpy(), filtered_df['artist'].to_numpy()))
+    ))
+    selected = st.selectbox("Select a track:", list(labels), format_func=labels.get)
+    pos = filtered_df.index.get_loc(selected)
+    
+    (track, artist, key, mode, scale, relative_scale, tempo, confidence, energy, brightness,
+     alternative_keys) = filtered_df[TRACK_DETAIL_COLUMNS].iloc[pos]
+    conf_color = conf_colors[pos]
+    
+    with st.container(border=True):
+        st.markdown(f"**{labels[selected]}**")
+        col1, col2 = st.columns(2)
         
-        with st.expander(f"{conf_icon} {row['track']} - {row['artist']}"):
-            col1, col2 = st.columns(2)
+        with col1:
+            st.write(f"**Key:** {key}")
+            st.write(f"**Mode:** {mode.capitalize()}")
+            st.write(f"**Scale (Combined):** {scale}")
+            st.write(f"**Relative Scale:** {relative_scale}")
             
-            with col1:
-                st.write(f"**Key:** {row['key']}")
-                st.write(f"**Mode:** {row['mode'].capitalize()}")
-                st.write(f"**Scale (Combined):** {row['scale']}")
-                st.write(f"**Relative Scale:** {row['relative_scale']}")
-                
-                # Confidence with color coding
-                conf_color = "green" if row['confidence'] >= 0.7 else "orange" if row['confidence'] >= 0.5 else "red"
-                st.markdown(f"**Confidence:** <span style='color:{conf_color}'>{row['confidence']:.1%}</span>", 
-                          unsafe_allow_html=True)
-                
-                # Warning for low confidence
-                if row['confidence'] < confidence_threshold:
-                    st.warning(f"⚠️ Low confidence - key detection may be inaccurate")
-                
-            with col2:
-                st.write(f"**Tempo:** {row['tempo']:.1f} BPM")
-                st.write(f"**Energy:** {row['energy']:.3f}")
-                st.write(f"**Brightness:** {row['brightness']:.1f}")
-                
-                # Show alternative keys if available and enabled
-                if show_alternatives and 'alternative_keys' in row and row['alternative_keys']:
-                    st.write("**Alternative Keys:**")
-                    for alt_key, alt_conf in row['alternative_keys'][:3]:  # Show top 3
-                        st.write(f"  • {alt_key}: {alt_conf:.1%}")
+            # Confidence with color coding
+            st.markdown(f"**Confidence:** <span style='color:{conf_color}'>{confidence:.1%}</span>", 
+                      unsafe_allow_html=True)
+            
+            # Warning for low confidence
+            if confidence < confidence_threshold:
+                st.warning(f"⚠️ Low confidence - key detection may be inaccurate")
+            
+        with col2:
+            st.write(f"**Tempo:** {tempo:.1f} BPM")
+            st.write(f"**Energy:** {energy:.3f}")
+            st.write(f"**Brightness:** {brightness:.1f}")
+            
+            # Show alternative keys if available and enabled
+            if show_alternatives and alternative_keys:
+                st.write("**Alternative Keys:**")
+                for alt_key, alt_conf in alternative_keys[:3]:  # Show top 3
+                    st.write(f"  • {alt_key}: {alt_conf:.1%}")
 
 def display_export_tab(df, csv_data, excel_data, json_data):
-    """Display export options with confidence summary"""
+    """Display export options with confidence summary.
+    Export data may be bytes/str or a zero-argument callable that builds them on download."""
     st.subheader("Export Options")
     
     # Add export summary
     with st.expander("Export Summary"):
-        st.write(f"**Total tracks:** {len(df)}")
-        st.write(f"**Average confidence:** {df['confidence'].mean():.1%}")
-        st.write(f"**Tracks with high confidence (≥70%):** {len(df[df['confidence'] >= 0.7])}")
-        st.write(f"**Tracks with low confidence (<50%):** {len(df[df['confidence'] < 0.5])}")
+        summary = compute_summary(df[SUMMARY_COLUMNS])
+        st.write(f"**Total tracks:** {summary.total}")
+        st.write(f"**Average confidence:** {summary.avg_confidence:.1%}")
+        st.write(f"**Tracks with high confidence (≥70%):** {summary.high_conf}")
+        st.write(f"**Tracks with low confidence (<50%):** {summary.low_conf}")
+    
+    # One timestamp for all three download names
+    file_stem = f"key_analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
     
     col1, col2 = st.columns(2)
     
@@ -262,7 +353,7 @@ def display_export_tab(df, csv_data, excel_data, json_data):
         st.download_button(
             label="Download as CSV",
             data=csv_data,
-            file_name=f"key_analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+            file_name=f"{file_stem}.csv",
             mime="text/csv"
         )
     
@@ -271,7 +362,7 @@ def display_export_tab(df, csv_data, excel_data, json_data):
         st.download_button(
             label="Download as Excel",
             data=excel_data,
-            file_name=f"key_analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
+            file_name=f"{file_stem}.xlsx",
             mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
         )
     
@@ -280,17 +371,29 @@ def display_export_tab(df, csv_data, excel_data, json_data):
     st.download_button(
         label="Download as JSON",
         data=json_data,
-        file_name=f"key_analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+        file_name=f"{file_stem}.json",
         mime="application/json"
     )
 
 
+# The sidebar reads cache stats on every rerun; reuse one directory scan for a few
+# seconds. Anything that changes the cache calls cached_cache_info.clear().
+@st.cache_data(ttl=10, show_spinner=False)
+def cached_cache_info():
+    """get_cache_info, shared across reruns for a short time"""
+    info = get_cache_info()
+    # The ten most recently written entries, picked once per scan instead of per render
+    info['recent'] = heapq.nlargest(10, info['files'], key=itemgetter('modified'))
+    return info
+
+# A fragment too, so its buttons only rerun this expander unless they change the cache
+@st.fragment
 def display_cache_management():
     """Display cache management options in sidebar with Spotify styling"""
     from cache_utils import get_cache_info, clear_cache, cleanup_old_cache, clear_specific_cache
     
     with st.expander("Cache Management", expanded=False):
-        cache_info = get_cache_info()
+        cache_info = cached_cache_info()
         
         # Cache stats with Spotify colors
         col1, col2 = st.columns(2)
@@ -306,6 +409,7 @@ def display_cache_management():
         with col1:
             if st.button("Clear All", type="secondary", use_container_width=True):
                 if clear_cache():
+                    cached_cache_info.clear()
                     st.success("Cache cleared!")
                     st.rerun()
                 else:
@@ -314,6 +418,7 @@ def display_cache_management():
         with col2:
             if st.button("Clear Old", type="secondary", use_container_width=True):
                 removed = cleanup_old_cache(days=7)
+                cached_cache_info.clear()
                 st.success(f"Removed {removed} files")
                 if removed > 0:
                     st.rerun()
@@ -322,34 +427,29 @@ def display_cache_management():
         if cache_info['count'] > 0:
             st.markdown("**Recent analyses:**")
             
-            # Create a scrollable container
-            container = st.container()
-            with container:
-                for file_info in sorted(cache_info['files'], 
-                                      key=lambda x: x['modified'], 
-                                      reverse=True)[:10]:
-                    
-                    # Format timestamp
-                    from datetime import datetime
-                    modified_date = datetime.fromtimestamp(file_info['modified'])
-                    date_str = modified_date.strftime("%Y-%m-%d %H:%M")
-                    
-                    # Display with Spotify styling
-                    col1, col2, col3 = st.columns([3, 2, 1])
-                    
-                    with col1:
-                        track_name = f"{file_info['artist']} - {file_info['track']}"
-                        if len(track_name) > 30:
-                            track_name = track_name[:30] + "..."
-                        st.markdown(f"<small style='color: #B3B3B3;'>{track_name}</small>", 
-                                  unsafe_allow_html=True)
-                    
-                    with col2:
-                        st.markdown(f"<small style='color: #666;'>{date_str}</small>", 
-                                  unsafe_allow_html=True)
-                    
-                    with col3:
-                        if st.button("❌", key=f"del_{file_info['hash']}", 
-                                   help="Delete this cache entry"):
-                            clear_specific_cache(file_info['hash'])
-                            st.rerun()
\ No newline at end of file
+            # Build the whole list as one table so it's a single element, not a
+            # markdown call per name and date
+            labels = {}
+            rows = []
+            for file_info in cache_info['recent']:
+                date_str = datetime.fromtimestamp(file_info['modified']).strftime("%Y-%m-%d %H:%M")
+                track_name = f"{file_info['artist']} - {file_info['track']}"
+                if len(track_name) > 30:
+                    track_name = track_name[:30] + "..."
+                labels[file_info['hash']] = f"{track_name} ({date_str}, {file_info['hash'][:8]})"
+                rows.append(
+                    f"<tr><td><small style='color: #B3B3B3;'>{track_name}</small></td>"
+                    f"<td><small style='color: #666;'>{date_str}</small></td></tr>"
+                )
+            st.markdown(f"<table>{''.join(rows)}</table>", unsafe_allow_html=True)
+            
+            # One delete control for the listed entries instead of a button per row
+            col1, col2 = st.columns([3, 1])
+            with col1:
+                selected_hash = st.selectbox("Cache entry", list(labels), format_func=labels.get,
+                                             key="cache_entry", label_visibility="collapsed")
+            with col2:
+                if st.button("❌", key="del_cache_entry", help="Delete this cache entry"):
+                    clear_specific_cache(selected_hash)
+                    cached_cache_info.clear()
+                    st.rerun()
\ No newline at end of file
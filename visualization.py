@@ -1,18 +1,52 @@
-import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
 
+# plotly.express is imported inside the chart builders: it adds noticeable
+# startup time and is only needed once there are results to plot
+
+# Chart colors matching the app theme
+SPOTIFY_COLORS = {
+    'bg': '#181818',
+    'grid': '#282828',
+    'text': '#FFFFFF',
+    'primary': '#1DB954',
+    'secondary': '#1ED760'
+}
+
+# Spotify theme applied in one update_layout call per figure. Set on the layout
+# rather than as a template, since Streamlit installs its own default template.
+SPOTIFY_LAYOUT = dict(
+    plot_bgcolor=SPOTIFY_COLORS['bg'],
+    paper_bgcolor=SPOTIFY_COLORS['bg'],
+    font_color=SPOTIFY_COLORS['text'],
+    title_font_color=SPOTIFY_COLORS['primary'],
+    title_font_size=20,
+    showlegend=True,
+    legend=dict(
+        bgcolor=SPOTIFY_COLORS['grid'],
+        bordercolor=SPOTIFY_COLORS['primary'],
+        borderwidth=1
+    ),
+    xaxis=dict(gridcolor=SPOTIFY_COLORS['grid']),
+    yaxis=dict(gridcolor=SPOTIFY_COLORS['grid'])
+)
+
 def create_visualizations(df):
-    """Create all analysis visualizations"""
+    """Create all analysis visualizations with the Spotify theme applied"""
     fig_keys = create_key_distribution_chart(df)
     fig_mode = create_mode_pie_chart(df)
     fig_tempo = create_tempo_histogram(df)
     fig_conf = create_confidence_box_plot(df)
     
+    for fig in (fig_keys, fig_mode, fig_tempo, fig_conf):
+        fig.update_layout(SPOTIFY_LAYOUT)
+    
     return fig_keys, fig_mode, fig_tempo, fig_conf
 
 def create_key_distribution_chart(df):
     """Create bar chart for key distribution"""
+    import plotly.express as px
+    
     key_counts = df['scale'].value_counts().reset_index()
     key_counts.columns = ['scale', 'count']
     
@@ -22,8 +56,9 @@ def create_key_distribution_chart(df):
         y='count',
         title="Track Distribution by Key",
         labels={'scale': 'Key', 'count': 'Number of Tracks'},
-        color='count',
-        color_continuous_scale='viridis'
+        # One static theme color: a count-mapped colorscale adds a colorbar and
+        # per-bar color data to the figure JSON sent on every rerun
+        color_discrete_sequence=[SPOTIFY_COLORS['primary']]
     )
     fig.update_layout(xaxis_tickangle=-45)
     
@@ -31,6 +66,8 @@ def create_key_distribution_chart(df):
 
 def create_mode_pie_chart(df):
     """Create pie chart for major vs minor distribution"""
+    import plotly.express as px
+    
     mode_counts = df['mode'].value_counts().reset_index()
     mode_counts.columns = ['mode', 'count']
     
@@ -46,7 +83,10 @@ def create_mode_pie_chart(df):
 
 def create_tempo_histogram(df):
     """Create histogram for tempo distribution"""
-    tempo_df = df[df['tempo'] > 0]
+    import plotly.express as px
+    
+    # Only the tempo column is plotted, so don't copy the rest of the rows' fields
+    tempo_df = df.loc[df['tempo'] > 0, ['tempo']]
     
     if len(tempo_df) > 0:
         fig = px.histogram(
@@ -69,6 +109,8 @@ def create_tempo_histogram(df):
 
 def create_confidence_box_plot(df):
     """Create box plot for confidence scores by mode"""
+    import plotly.express as px
+    
     fig = px.box(
         df,
         y='confidence',
@@ -81,6 +123,8 @@ def create_confidence_box_plot(df):
 
 def create_key_transition_chart(transitions_df):
     """Create scatter plot for key transitions"""
+    import plotly.express as px
+    
     fig = px.scatter(
         transitions_df,
         x='position',
@@ -89,5 +133,6 @@ def create_key_transition_chart(transitions_df):
         title="Key Distance Between Consecutive Tracks",
         labels={'position': 'Track Position', 'distance': 'Semitone Distance'}
     )
+    fig.update_layout(SPOTIFY_LAYOUT)
     
     return fig
\ No newline at end of file